@@ -1,4 +1,12 @@
+from os import environ
+
+from waitress import serve
+
 from src.app import app
 
 if __name__ == "__main__":
-    app.run(debug=True, host="0.0.0.0", port=8080)
+    if environ.get("FLASK_DEBUG") == "1":
+        app.run(debug=True, host="0.0.0.0", port=8080)
+
+    else:
+        serve(app, host="0.0.0.0", port=8080, threads=8)
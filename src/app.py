@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+from functools import lru_cache
+from hashlib import blake2b
 from os import path
-from typing import Any
 
-from flask import Flask, jsonify, render_template, request
+import orjson
+from flask import Flask, Response, render_template, request
 
 from src import texformatter
 
@@ -13,6 +15,124 @@ app = Flask(
     static_folder=path.join(path.dirname(__file__), "..", "static"),
 )
 
+app.config["MAX_LATEX_BYTES"] = 5 * 1024 * 1024
+app.config["MAX_LATEX_LINES"] = 100_000
+app.config["MAX_FORMATTED_BYTES"] = 20 * 1024 * 1024
+app.config["MAX_INDENT_STR_LENGTH"] = 16
+app.config["MAX_CACHED_LATEX_BYTES"] = 64 * 1024
+
+
+def json_response(payload: dict[str, str], status: int = 200) -> Response:
+    """Serialize payload with orjson into an application/json response."""
+    return Response(
+        orjson.dumps(payload), status=status, mimetype="application/json"
+    )
+
+
+@lru_cache(maxsize=256)
+def memoized_indent_latex(latex_code: str, indent_str: str) -> str:
+    """Memoize texformatter.indent_latex for repeated submissions."""
+    return texformatter.indent_latex(latex_code, indent_str)
+
+
+def cached_indent_latex(
+    latex_code: str, indent_str: str, size_bound: int
+) -> str:
+    """Format latex_code, memoizing only documents small enough to keep.
+
+    size_bound is formatted_size_bound for the request, which is at
+    least the UTF-8 size of both the source and the result. Requests
+    where it exceeds MAX_CACHED_LATEX_BYTES bypass the cache, so its
+    entries together hold at most 256 * 2 * MAX_CACHED_LATEX_BYTES
+    bytes of UTF-8 text (32 MiB by default).
+    """
+    if size_bound > app.config["MAX_CACHED_LATEX_BYTES"]:
+        return texformatter.indent_latex(latex_code, indent_str)
+
+    return memoized_indent_latex(latex_code, indent_str)
+
+
+def request_etag() -> str:
+    """Return an ETag identifying the formatting request.
+
+    The digest covers everything that affects the output: the content
+    type, the query string (which carries indent_str for text/plain) and
+    the raw body.
+    """
+    digest = blake2b(digest_size=16)
+
+    for part in (
+        request.mimetype.encode(),
+        request.query_string,
+        request.get_data(),
+    ):
+        digest.update(part)
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+
+def too_large_response() -> Response:
+    """Return the 413 error sent for documents over the configured limits."""
+    return json_response({"error": "LaTeX code too large"}, 413)
+
+
+def formatted_size_bound(
+    latex_code: str, indent_str: str, lines: list[str]
+) -> int:
+    """Return an upper bound on the UTF-8 size of the formatted code.
+
+    No formatted line is indented deeper than texformatter.max_env_depth
+    plus one level per section command, and each line gains at most a
+    newline. For ordinary documents this stays close to the input size.
+    """
+    max_depth = texformatter.max_env_depth(lines) + len(
+        texformatter.get_section_levels()
+    )
+
+    line_bytes = 1 + max_depth * len(indent_str.encode())
+    return len(latex_code.encode()) + len(lines) * line_bytes
+
+
+def bounded_format_lines(latex_code: str, indent_str: str) -> list[str] | None:
+    """Format latex_code in one pass, counting the output as it goes.
+
+    Returns the formatted lines, or None as soon as their UTF-8 size
+    passes MAX_FORMATTED_BYTES.
+    """
+    limit = app.config["MAX_FORMATTED_BYTES"]
+    formatted_lines: list[str] = []
+    size = 0
+
+    for line in texformatter.iter_indent_latex(latex_code, indent_str):
+        size += len(line.encode()) + 1
+
+        if size > limit:
+            return None
+
+        formatted_lines.append(line)
+
+    return formatted_lines
+
+
+def rejected_request_response(
+    latex_code: object, indent_str: object
+) -> Response | None:
+    """Return the 400 response for a request with invalid fields, if any.
+
+    latex_code and indent_str must be strings, and indent_str may be at
+    most MAX_INDENT_STR_LENGTH characters long.
+    """
+    if not isinstance(latex_code, str) or not isinstance(indent_str, str):
+        return json_response(
+            {"error": "latex_code and indent_str must be strings"}, 400
+        )
+
+    if len(indent_str) > app.config["MAX_INDENT_STR_LENGTH"]:
+        return json_response({"error": "indent_str too long"}, 400)
+
+    return None
+
 
 @app.route("/")
 def index() -> str:
@@ -21,19 +141,94 @@ def index() -> str:
 
 
 @app.route("/format", methods=["POST"])
-def format_latex() -> tuple[Any, int] | Any:  # TODO: fix type
-    """Format LaTeX code and return the result."""
-    data = request.get_json()
+def format_latex() -> Response:
+    """Format LaTeX code and return the result.
+
+    Requests sent as text/plain skip JSON entirely: the body is the LaTeX
+    source, the indent is read from the indent_str query parameter, and
+    the formatted code is streamed back line by line as plain text.
+
+    Successful responses carry an ETag; a request whose If-None-Match
+    header already holds it is answered with an empty 304. Bodies over
+    MAX_LATEX_BYTES or MAX_LATEX_LINES, or whose output would exceed
+    MAX_FORMATTED_BYTES, are rejected with a 413, and non-string fields
+    or an over-long indent_str with a 400. The output size is bounded
+    from a cheap nesting prescan; only when that bound is over the limit
+    is the document formatted up front, once, to measure it.
+    """
+    if (request.content_length or 0) > app.config["MAX_LATEX_BYTES"]:
+        return too_large_response()
+
+    etag = request_etag()
+
+    if (
+        not request.if_none_match.star_tag
+        and etag in request.if_none_match
+    ):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    if request.mimetype == "text/plain":
+        latex_code = request.get_data(as_text=True)
+        indent_str = request.args.get("indent_str", "    ")
+
+    else:
+        data = request.get_json()
 
-    if not data or "latex_code" not in data:
-        return jsonify({"error": "No LaTeX code provided"}), 400
+        if not isinstance(data, dict) or "latex_code" not in data:
+            return json_response({"error": "No LaTeX code provided"}, 400)
 
-    latex_code = data["latex_code"]
-    indent_str = data.get("indent_str", "    ")  # Default to 4 spaces
+        latex_code = data["latex_code"]
+        indent_str = data.get("indent_str", "    ")  # Default to 4 spaces
+
+    rejected = rejected_request_response(latex_code, indent_str)
+
+    if rejected is not None:
+        return rejected
+
+    lines = texformatter.split_into_lines(latex_code)
+
+    if len(lines) > app.config["MAX_LATEX_LINES"]:
+        return too_large_response()
+
+    size_bound = formatted_size_bound(latex_code, indent_str, lines)
+    formatted_lines = None
+
+    if size_bound > app.config["MAX_FORMATTED_BYTES"]:
+        formatted_lines = bounded_format_lines(latex_code, indent_str)
+
+        if formatted_lines is None:
+            return too_large_response()
+
+    if request.mimetype == "text/plain":
+        if formatted_lines is None:
+            formatted_lines = texformatter.iter_indent_latex(
+                latex_code, indent_str
+            )
+
+        response = Response(
+            (line + "\n" for line in formatted_lines),
+            mimetype="text/plain",
+        )
+
+        response.set_etag(etag)
+        return response
 
     try:
-        formatted_code = texformatter.indent_latex(latex_code, indent_str)
-        return jsonify({"formatted_code": formatted_code})
+        if formatted_lines is None:
+            formatted_code = cached_indent_latex(
+                latex_code, indent_str, size_bound
+            )
+
+        else:
+            formatted_code = "\n".join(formatted_lines)
+
+        response = json_response({"formatted_code": formatted_code})
+        response.set_etag(etag)
+        return response
 
     except Exception as e:
-        return jsonify({"error": f"Error formatting code: {str(e)}"}), 500
+        return json_response(
+            {"error": f"Error formatting code: {str(e)}"}, 500
+        )
@@ -1,9 +1,49 @@
 from __future__ import annotations
 
+import sys
 from argparse import ArgumentParser
-from functools import reduce
-from re import match
-from shutil import copy2
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, reduce
+from os import cpu_count, path, remove, replace
+from shutil import copy2, copymode
+from tempfile import mkstemp
+from typing import TextIO
+
+_SECTION_RANKS = {
+    "\\chapter": 0,
+    "\\section": 1,
+    "\\subsection": 2,
+    "\\subsubsection": 3,
+}
+
+_SECTION_NAME_LENGTHS = sorted(
+    {len(name) for name in _SECTION_RANKS}, reverse=True
+)
+
+_SECTION_INITIALS = frozenset(name[1] for name in _SECTION_RANKS)
+
+_MAX_CACHED_PREFIX_LENGTH = 256
+
+_MAX_PREFIX_TABLE_DEPTH = 64
+
+
+@lru_cache(maxsize=512)
+def cached_indent_prefix(indent_str: str, depth: int) -> str:
+    """Return indent_str repeated depth times, shared across calls."""
+    return indent_str * depth
+
+
+def indent_prefix(indent_str: str, depth: int) -> str:
+    """Return indent_str repeated depth times.
+
+    Only short prefixes go through cached_indent_prefix, so the cache
+    stays small however long indent_str is or however deep the nesting.
+    """
+    if len(indent_str) * (depth + 1) > _MAX_CACHED_PREFIX_LENGTH:
+        return indent_str * depth
+
+    return cached_indent_prefix(indent_str, depth)
 
 
 def indent_environments(
@@ -13,10 +53,10 @@ def indent_environments(
     \\end{...}
     """
     env_stack: list[str] = []
-    new_lines = []
+    new_lines = [""] * len(lines)
     in_verbatim = False
 
-    for line in lines:
+    for i, line in enumerate(lines):
         stripped = line.strip()
 
         if in_verbatim:
@@ -24,21 +64,23 @@ def indent_environments(
                 in_verbatim = False
 
             else:
-                new_lines.append(line)
+                new_lines[i] = line
                 continue
 
         if stripped.startswith("\\end{") and env_stack:
             env_stack.pop()
 
-        new_lines.append(indent_str * len(env_stack) + stripped)
-        m = match(r"\\begin\{([^}]+)}", stripped)
+        new_lines[i] = indent_prefix(indent_str, len(env_stack)) + stripped
+
+        if stripped.startswith("\\begin{"):
+            rb = stripped.find("}", 7)
 
-        if m:
-            env = m.group(1)
-            env_stack.append(env)
+            if rb > 7:
+                env = stripped[7:rb]
+                env_stack.append(env)
 
-            if env == "verbatim":
-                in_verbatim = True
+                if env == "verbatim":
+                    in_verbatim = True
 
     return new_lines
 
@@ -51,32 +93,32 @@ def indent_section_level(
 ) -> list[str]:
     """Generic indentation function for sections, subsections, etc."""
     in_section, in_verbatim = False, False
-    new_lines = []
+    exit_prefixes = (*exit_commands, "\\end{document}")
+    indent_width = len(indent_str)
+    new_lines = [""] * len(lines)
 
-    for line in lines:
-        stripped = line.strip()
+    for i, line in enumerate(lines):
+        lstripped = line.lstrip(" \t")
+        stripped = lstripped.strip()
 
         if stripped.startswith("\\begin{verbatim}"):
             in_verbatim = True
-            new_lines.append(line)
+            new_lines[i] = line
             continue
 
         if in_verbatim:
             if stripped.startswith("\\end{verbatim}"):
                 in_verbatim = False
-                new_lines.append(line)
+                new_lines[i] = line
                 continue
 
-            new_lines.append(line)
+            new_lines[i] = line
             continue
 
-        current_line_lstripped = line.lstrip(" \t")
-        current_indent_chars = len(line) - len(current_line_lstripped)
+        current_indent_chars = len(line) - len(lstripped)
 
         current_indent_level = (
-            current_indent_chars // len(indent_str)
-            if len(indent_str) > 0
-            else 0
+            current_indent_chars // indent_width if indent_width > 0 else 0
         )
 
         if stripped.startswith(command):
@@ -84,10 +126,7 @@ def indent_section_level(
             in_section = True
 
         elif in_section:
-            if (
-                any(stripped.startswith(cmd) for cmd in exit_commands)
-                or stripped == "\\end{document}"
-            ):
+            if stripped.startswith(exit_prefixes):
                 new_indent_level = current_indent_level
                 in_section = False
 
@@ -97,7 +136,7 @@ def indent_section_level(
         else:
             new_indent_level = current_indent_level
 
-        new_lines.append(indent_str * new_indent_level + stripped)
+        new_lines[i] = indent_prefix(indent_str, new_indent_level) + stripped
 
     return new_lines
 
@@ -141,11 +180,12 @@ def final_cleanup(
     lines: list[str],
 ) -> list[str]:
     """Trim trailing spaces, collapse multiple blank lines into one,
-    and remove leading/trailing blank lines by delegating to focused helpers.
+    and remove leading/trailing blank lines.
+
+    List form of iter_final_cleanup; the result equals
+    trim_edge_blank_lines(collapse_and_trim_lines(lines)).
     """
-    collapsed = collapse_and_trim_lines(lines)
-    trimmed = trim_edge_blank_lines(collapsed)
-    return trimmed
+    return list(iter_final_cleanup(lines))
 
 
 def split_into_lines(code: str) -> list[str]:
@@ -187,22 +227,323 @@ def apply_section_indents(lines: list[str], indent_str: str) -> list[str]:
     )
 
 
+def section_rank(stripped: str) -> int | None:
+    """Return the get_section_levels index of the sectioning command a
+    stripped line starts with, or None if it starts with none of them.
+
+    The command must be a whole control word, so \\section{...} and
+    \\section*{...} match but \\sectionmark{...} does not.
+    """
+    if stripped[1:2] not in _SECTION_INITIALS:
+        return None
+
+    for length in _SECTION_NAME_LENGTHS:
+        rank = _SECTION_RANKS.get(stripped[:length])
+
+        if rank is not None:
+            return None if stripped[length : length + 1].isalpha() else rank
+
+    return None
+
+
+def indent_lines(
+    lines: Iterable[str],
+    indent_str: str = "    ",
+    has_sections: bool = True,
+) -> Iterator[str]:
+    """Apply environment and section indentation in a single pass.
+
+    Each line is stripped and indented exactly once and yielded as soon
+    as it is ready. The result matches running indent_environments
+    followed by indent_section_level for every entry of
+    get_section_levels, with two differences: sectioning commands are
+    recognised by section_rank, which, unlike the prefix test in
+    indent_section_level, ignores longer control words such as
+    \\sectionmark; and \\begin{verbatim} and \\end{verbatim} lines get
+    their section indent, which the standalone passes leave out (the
+    verbatim body itself is never touched). Blank lines outside
+    verbatim are yielded empty. Passing has_sections=False skips
+    sectioning command detection for input known to contain none.
+    Prefixes for the first _MAX_PREFIX_TABLE_DEPTH levels come from
+    indent_prefix, so short ones are shared across calls, and are added
+    to the table only as deep as the input nests; deeper lines build
+    theirs on the fly.
+    """
+    section_levels = get_section_levels()
+
+    # Open section levels are bits of open_sections (bit i = level i).
+    # A sectioning command of rank r keeps only the open levels it does
+    # not exit, each of which indents the line by one, and opens level r.
+    keep_masks = [
+        sum(
+            1 << level
+            for level, (_, exit_commands) in enumerate(section_levels)
+            if level != rank and command not in exit_commands
+        )
+        for rank, (command, _) in enumerate(section_levels)
+    ]
+
+    popcounts = [bin(mask).count("1") for mask in range(1 << len(keep_masks))]
+    open_sections = 0
+    prefixes = [""]
+    env_depth = 0
+    in_verbatim = False
+
+    for line in lines:
+        stripped = line.strip()
+
+        if in_verbatim:
+            if stripped.startswith("\\end{verbatim}"):
+                in_verbatim = False
+
+            else:
+                yield line
+                continue
+
+        if not stripped:
+            yield ""
+            continue
+
+        if not stripped.startswith("\\"):
+            depth = env_depth + popcounts[open_sections]
+
+        else:
+            is_end = stripped.startswith("\\end{")
+
+            if is_end and env_depth:
+                env_depth -= 1
+
+            depth = env_depth
+            rank = section_rank(stripped) if has_sections else None
+            end_document = is_end and stripped.startswith("document}", 5)
+
+            if end_document:
+                open_sections = 0
+
+            elif rank is None:
+                depth += popcounts[open_sections]
+
+            else:
+                open_sections &= keep_masks[rank]
+                depth += popcounts[open_sections]
+                open_sections |= 1 << rank
+
+            if stripped.startswith("\\begin{"):
+                rb = stripped.find("}", 7)
+
+                if rb > 7:
+                    env_depth += 1
+
+                    if stripped[7:rb] == "verbatim":
+                        in_verbatim = True
+
+        if depth >= _MAX_PREFIX_TABLE_DEPTH:
+            yield indent_str * depth + stripped
+            continue
+
+        while depth >= len(prefixes):
+            prefixes.append(indent_prefix(indent_str, len(prefixes)))
+
+        yield prefixes[depth] + stripped
+
+
+def max_env_depth(lines: Iterable[str]) -> int:
+    """Return the deepest environment nesting indent_lines reaches.
+
+    Follows the \\begin, \\end and verbatim rules of indent_lines
+    without building any output, so the result plus the number of
+    section levels bounds the indent of every formatted line.
+    """
+    env_depth, deepest = 0, 0
+    in_verbatim = False
+
+    for line in lines:
+        stripped = line.lstrip()
+
+        if in_verbatim:
+            if not stripped.startswith("\\end{verbatim}"):
+                continue
+
+            in_verbatim = False
+
+        if stripped.startswith("\\end{"):
+            if env_depth:
+                env_depth -= 1
+
+        elif stripped.startswith("\\begin{"):
+            rb = stripped.find("}", 7)
+
+            if rb > 7:
+                env_depth += 1
+
+                if env_depth > deepest:
+                    deepest = env_depth
+
+                in_verbatim = stripped[7:rb] == "verbatim"
+
+    return deepest
+
+
+def iter_final_cleanup(lines: Iterable[str]) -> Iterator[str]:
+    """Streaming counterpart of final_cleanup: trim trailing spaces,
+    collapse runs of blank lines into one, and drop blank lines at
+    either end, yielding each line as soon as it is known to be kept.
+    """
+    emitted, pending_blank = False, False
+
+    for line in lines:
+        line = line.rstrip()
+
+        if line == "":
+            pending_blank = emitted
+            continue
+
+        if pending_blank:
+            yield ""
+            pending_blank = False
+
+        yield line
+        emitted = True
+
+
+def iter_indent_latex(code: str, indent_str: str = "    ") -> Iterator[str]:
+    """Yield the lines of indent_latex(code, indent_str) one at a time."""
+    has_sections = any(name in code for name in _SECTION_RANKS)
+
+    return iter_final_cleanup(
+        indent_lines(split_into_lines(code), indent_str, has_sections)
+    )
+
+
+def write_lines(lines: Iterable[str], out: TextIO) -> None:
+    """Write lines to out separated by newlines, without a trailing one."""
+    separator = ""
+
+    for line in lines:
+        out.write(separator)
+        out.write(line)
+        separator = "\n"
+
+
 def indent_latex(code: str, indent_str: str = "    ") -> str:
     """Main Function: Indent LaTeX Code"""
-    src_lines = split_into_lines(code)
-    env_indented = apply_environment_indentation(src_lines, indent_str)
-    section_indented = apply_section_indents(env_indented, indent_str)
-    cleaned = final_cleanup(section_indented)
-    return "\n".join(cleaned)
+    return "\n".join(iter_indent_latex(code, indent_str))
+
+
+def print_formatted(file_path: str, indent_str: str) -> None:
+    """Stream the formatted contents of file_path to stdout.
+
+    Each line read from the file is split again with str.splitlines, so
+    the output matches indent_latex on the whole file even when it holds
+    separators such as form feeds that file iteration leaves alone.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        lines = (part for line in f for part in line.splitlines())
+        formatted_lines = iter_final_cleanup(indent_lines(lines, indent_str))
+        sys.stdout.write("\n\n")
+        write_lines(formatted_lines, sys.stdout)
+        sys.stdout.write("\n\n\n")
+
+
+def format_in_place(file_path: str, indent_str: str, backup: bool) -> bool:
+    """Rewrite file_path with its formatted contents.
+
+    Returns False without touching the file (or creating a backup) when
+    it is already formatted. Otherwise the original is copied to
+    file_path + ".bak" if backup is set, and the result is written to a
+    uniquely named temporary sibling that replaces the original
+    atomically and is removed again if anything fails.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        latex_code = f.read()
+
+    formatted_code = indent_latex(latex_code, indent_str)
 
+    if formatted_code == latex_code:
+        return False
 
-def main() -> None:
-    """Main function for the LaTeX formatter"""
+    if backup:
+        copy2(file_path, file_path + ".bak")
+
+    fd, tmp_file = mkstemp(
+        dir=path.dirname(file_path) or ".",
+        prefix=path.basename(file_path) + ".",
+        suffix=".tmp",
+    )
+
+    try:
+        with open(fd, "w", encoding="utf-8") as f:
+            f.write(formatted_code)
+
+        copymode(file_path, tmp_file)
+        replace(tmp_file, file_path)
+
+    except BaseException:
+        if path.exists(tmp_file):
+            remove(tmp_file)
+
+        raise
+
+    return True
+
+
+def format_files_in_place(
+    file_paths: list[str], indent_str: str, backup: bool
+) -> Iterator[tuple[str, bool | Exception]]:
+    """Run format_in_place over file_paths, yielding (path, result) pairs
+    in order, where result is whether the file changed or the exception
+    raised while formatting it. Paths naming the same file are formatted
+    once, and several files are formatted in parallel worker processes.
+    """
+    unique_paths: dict[str, str] = {}
+
+    for file_path in file_paths:
+        unique_paths.setdefault(path.realpath(file_path), file_path)
+
+    file_paths = list(unique_paths.values())
+
+    if len(file_paths) == 1:
+        try:
+            result: bool | Exception = format_in_place(
+                file_paths[0], indent_str, backup
+            )
+
+        except Exception as e:
+            result = e
+
+        yield file_paths[0], result
+        return
+
+    workers = min(len(file_paths), cpu_count() or 1)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(format_in_place, file_path, indent_str, backup)
+            for file_path in file_paths
+        ]
+
+        for file_path, future in zip(file_paths, futures):
+            try:
+                result = future.result()
+
+            except Exception as e:
+                result = e
+
+            yield file_path, result
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Main function for the LaTeX formatter
+
+    argv defaults to sys.argv[1:] when omitted.
+    """
     parser = ArgumentParser(
         description="Format LaTeX source code with proper indentation."
     )
 
-    parser.add_argument("file", help="LaTeX file to format")
+    parser.add_argument(
+        "files", metavar="file", nargs="+", help="LaTeX file(s) to format"
+    )
 
     parser.add_argument(
         "-i",
@@ -218,7 +559,9 @@ def main() -> None:
         help="Create a backup of the original file before editing in place",
     )
 
-    parser.add_argument(
+    indent_group = parser.add_mutually_exclusive_group()
+
+    indent_group.add_argument(
         "-s",
         "--spaces",
         type=int,
@@ -226,35 +569,53 @@ def main() -> None:
         help="Number of spaces per indent level (default: 4)",
     )
 
-    parser.add_argument(
+    indent_group.add_argument(
         "-t",
         "--tabs",
         action="store_true",
         help="Use tab character instead of spaces for indentation",
     )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     indent_str = "\t" if args.tabs else " " * args.spaces
 
-    with open(args.file, "r", encoding="utf-8") as f:
-        latex_code = f.read()
-
-    formatted_code = indent_latex(latex_code, indent_str)
+    failed = False
 
     if args.in_place:
-        if args.backup:
-            backup_file = args.file + ".bak"
-            copy2(args.file, backup_file)
-            print(f"Backup created: {backup_file}")
+        for file_path, changed in format_files_in_place(
+            args.files, indent_str, args.backup
+        ):
+            if isinstance(changed, Exception):
+                print(
+                    f"Error formatting {file_path}: {changed}", file=sys.stderr
+                )
+
+                failed = True
+                continue
 
-        with open(args.file, "w", encoding="utf-8") as f:
-            f.write(formatted_code)
+            if not changed:
+                print(f"File already formatted: {file_path}")
+                continue
+
+            if args.backup:
+                print(f"Backup created: {file_path}.bak")
 
-        print(f"File formatted in place: {args.file}")
+            print(f"File formatted in place: {file_path}")
 
     else:
-        print("\n\n" + formatted_code + "\n\n")
+        for file_path in args.files:
+            if len(args.files) > 1:
+                print(f"==> {file_path} <==")
+
+            try:
+                print_formatted(file_path, indent_str)
+
+            except Exception as e:
+                print(f"Error formatting {file_path}: {e}", file=sys.stderr)
+                failed = True
 
+    if failed:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,216 @@
+from unittest import TestCase, main, mock
+
+from src import texformatter
+from src.app import (
+    app,
+    bounded_format_lines,
+    memoized_indent_latex,
+)
+
+
+class TestFormatEndpoint(TestCase):
+    """Test cases for the /format endpoint."""
+
+    def setUp(self) -> None:
+        """Set up the Flask test client."""
+        self.client = app.test_client()
+        self.latex_code = "\\begin{document}\nHello\n\\end{document}"
+        self.expected = "\\begin{document}\n    Hello\n\\end{document}"
+
+    def test_format_json(self) -> None:
+        """Test formatting a JSON request."""
+        response = self.client.post(
+            "/format", json={"latex_code": self.latex_code}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(response.get_json()["formatted_code"], self.expected)
+
+    def test_format_json_missing_code(self) -> None:
+        """Test that a JSON request without latex_code is rejected."""
+        response = self.client.post("/format", json={})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.get_json())
+
+    def test_format_json_rejects_non_string_fields(self) -> None:
+        """Test that non-string latex_code or indent_str gives a 400."""
+        for payload in (
+            {"latex_code": 5},
+            {"latex_code": None},
+            {"latex_code": self.latex_code, "indent_str": 2},
+        ):
+            response = self.client.post("/format", json=payload)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("error", response.get_json())
+
+    def test_format_rejects_long_indent_str(self) -> None:
+        """Test that an indent_str over MAX_INDENT_STR_LENGTH gives a 400."""
+        indent_str = " " * (app.config["MAX_INDENT_STR_LENGTH"] + 1)
+
+        response = self.client.post(
+            "/format",
+            json={"latex_code": self.latex_code, "indent_str": indent_str},
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.get_json())
+
+    def test_format_plain_text(self) -> None:
+        """Test formatting a text/plain request."""
+        response = self.client.post(
+            "/format?indent_str=%09",
+            data=self.latex_code,
+            content_type="text/plain",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/plain")
+
+        self.assertEqual(
+            response.get_data(as_text=True),
+            "\\begin{document}\n\tHello\n\\end{document}\n",
+        )
+
+    def test_format_etag_not_modified(self) -> None:
+        """Test that a repeated request with If-None-Match gets a 304."""
+        first = self.client.post(
+            "/format", json={"latex_code": self.latex_code}
+        )
+
+        etag = first.headers["ETag"]
+
+        second = self.client.post(
+            "/format",
+            json={"latex_code": self.latex_code},
+            headers={"If-None-Match": etag},
+        )
+
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.get_data(), b"")
+
+        changed = self.client.post(
+            "/format",
+            json={"latex_code": self.latex_code, "indent_str": "\t"},
+            headers={"If-None-Match": etag},
+        )
+
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["ETag"], etag)
+
+    def test_format_etag_star_is_ignored(self) -> None:
+        """Test that If-None-Match: * does not produce a 304."""
+        response = self.client.post(
+            "/format",
+            json={"latex_code": self.latex_code},
+            headers={"If-None-Match": "*"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["formatted_code"], self.expected)
+
+    def test_format_rejects_too_many_lines(self) -> None:
+        """Test that documents over MAX_LATEX_LINES are rejected."""
+        latex_code = "x\n" * app.config["MAX_LATEX_LINES"]
+
+        response = self.client.post(
+            "/format", data=latex_code, content_type="text/plain"
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(
+            "/format", data=latex_code + "x\n", content_type="text/plain"
+        )
+
+        self.assertEqual(response.status_code, 413)
+        self.assertIn("error", response.get_json())
+
+    def test_format_counts_lines_like_the_formatter(self) -> None:
+        """Test that carriage-return line breaks count toward the limit."""
+        latex_code = "x\r" * (app.config["MAX_LATEX_LINES"] + 1)
+
+        response = self.client.post(
+            "/format", json={"latex_code": latex_code}
+        )
+
+        self.assertEqual(response.status_code, 413)
+
+    def test_format_rejects_oversized_output(self) -> None:
+        """Test that deep nesting whose output would explode is rejected."""
+        latex_code = "\\begin{a}\n" * 10_000
+
+        response = self.client.post(
+            "/format", data=latex_code, content_type="text/plain"
+        )
+
+        self.assertEqual(response.status_code, 413)
+        self.assertIn("error", response.get_json())
+
+    def test_format_skips_measuring_ordinary_documents(self) -> None:
+        """Test that documents well within the limit are formatted once."""
+        latex_code = "\\begin{itemize}\n\\item x\n\\end{itemize}\n" * 20_000
+
+        with mock.patch(
+            "src.app.bounded_format_lines", wraps=bounded_format_lines
+        ) as measure:
+            response = self.client.post(
+                "/format", json={"latex_code": latex_code}
+            )
+
+        self.assertEqual(response.status_code, 200)
+        measure.assert_not_called()
+
+    def test_format_measures_documents_over_the_bound(self) -> None:
+        """Test that a document whose bound is over the limit but whose
+        output is not is still formatted correctly."""
+        latex_code = "x\n" * 80_000 + "\\begin{a}\n" * 100
+        expected = texformatter.indent_latex(latex_code, "    ")
+
+        response = self.client.post(
+            "/format", json={"latex_code": latex_code}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["formatted_code"], expected)
+
+        response = self.client.post(
+            "/format", data=latex_code, content_type="text/plain"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(as_text=True), expected + "\n")
+
+    def test_format_rejects_too_many_bytes(self) -> None:
+        """Test that bodies over MAX_LATEX_BYTES are rejected."""
+        latex_code = "x" * (app.config["MAX_LATEX_BYTES"] + 1)
+
+        response = self.client.post(
+            "/format", json={"latex_code": latex_code}
+        )
+
+        self.assertEqual(response.status_code, 413)
+
+    def test_format_caches_only_small_results(self) -> None:
+        """Test that documents whose source or result may exceed
+        MAX_CACHED_LATEX_BYTES of UTF-8 are not kept in the cache."""
+        limit = app.config["MAX_CACHED_LATEX_BYTES"]
+        memoized_indent_latex.cache_clear()
+
+        for latex_code, indent_str in (
+            ("\\begin{a}\n" * 1580, " " * 16),
+            ("\u00e9" * (limit // 2 + 1), "  "),
+        ):
+            response = self.client.post(
+                "/format",
+                json={"latex_code": latex_code, "indent_str": indent_str},
+            )
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(memoized_indent_latex.cache_info().currsize, 0)
+
+        self.client.post("/format", json={"latex_code": self.latex_code})
+        self.assertEqual(memoized_indent_latex.cache_info().currsize, 1)
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import sys
-from os import path, remove, rmdir
+from io import StringIO
+from os import chmod, listdir, path, remove, rmdir, stat
 from subprocess import run
 from sys import executable
 from tempfile import mkdtemp
@@ -71,6 +72,32 @@ class TestTexFormatter(TestCase):
         result = texformatter.indent_environments(input_lines, "\t")
         self.assertEqual(result, expected)
 
+    def test_indent_environments_malformed_begin(self) -> None:
+        """Test that empty or unterminated \\begin lines open nothing."""
+        input_lines = [
+            "\\begin{}",
+            "\\begin{itemize",
+            "Text",
+            "\\begin{itemize}",
+            "\\item Item",
+            "\\end{itemize}",
+        ]
+
+        expected = [
+            "\\begin{}",
+            "\\begin{itemize",
+            "Text",
+            "\\begin{itemize}",
+            "    \\item Item",
+            "\\end{itemize}",
+        ]
+
+        result = texformatter.indent_environments(input_lines)
+        self.assertEqual(result, expected)
+
+        code = "\n".join(input_lines)
+        self.assertEqual(texformatter.indent_latex(code), "\n".join(expected))
+
     def test_indent_section_level_chapter(self) -> None:
         """Test chapter level indentation."""
         input_lines = [
@@ -136,6 +163,26 @@ class TestTexFormatter(TestCase):
 
         self.assertEqual(result, expected)
 
+    def test_indent_section_level_end_document_with_comment(self) -> None:
+        """Test that \\end{document} followed by a comment closes a section."""
+        input_lines = [
+            "\\section{Section}",
+            "Content",
+            "\\end{document} % done",
+        ]
+
+        expected = [
+            "\\section{Section}",
+            "    Content",
+            "\\end{document} % done",
+        ]
+
+        result = texformatter.indent_section_level(
+            input_lines, "\\section", ["\\section"]
+        )
+
+        self.assertEqual(result, expected)
+
     def test_indent_latex_complete(self) -> None:
         """Test complete LaTeX indentation."""
         input_lines = [
@@ -176,6 +223,30 @@ class TestTexFormatter(TestCase):
         result = texformatter.indent_latex(input_code)
         self.assertEqual(result, expected)
 
+    def test_indent_latex_ignores_longer_control_words(self) -> None:
+        """Test that \\sectionmark is not mistaken for \\section."""
+        input_code = "\n".join(
+            [
+                "\\section*{Section}",
+                "Content",
+                "\\sectionmark{Mark}",
+                "\\chaptername",
+                "More content",
+            ]
+        )
+
+        expected = "\n".join(
+            [
+                "\\section*{Section}",
+                "    Content",
+                "    \\sectionmark{Mark}",
+                "    \\chaptername",
+                "    More content",
+            ]
+        )
+
+        self.assertEqual(texformatter.indent_latex(input_code), expected)
+
     def test_indent_latex_with_tabs(self) -> None:
         """Test complete LaTeX indentation with tabs."""
         input_lines = [
@@ -210,6 +281,114 @@ class TestTexFormatter(TestCase):
         self.assertTrue(lines[1].startswith("  \\section"))
         self.assertTrue(lines[2].startswith("    Content"))
 
+    def test_iter_indent_latex_matches_indent_latex(self) -> None:
+        """Test that the streaming formatter yields the same lines."""
+        input_code = (
+            "\n\n\\begin{document}\n\n\n\nHello   \n\\end{document}\n\n"
+        )
+
+        result = list(texformatter.iter_indent_latex(input_code))
+
+        self.assertEqual(
+            result, ["\\begin{document}", "", "    Hello", "\\end{document}"]
+        )
+
+        self.assertEqual(
+            "\n".join(result), texformatter.indent_latex(input_code)
+        )
+
+    def test_indent_lines_indents_verbatim_delimiters_in_sections(
+        self,
+    ) -> None:
+        """Test that the fused pass section-indents verbatim delimiters,
+        unlike the standalone passes."""
+        input_lines = [
+            "\\section{A}",
+            "\\begin{verbatim}",
+            " x",
+            "\\end{verbatim}",
+        ]
+
+        standalone = texformatter.apply_section_indents(
+            texformatter.apply_environment_indentation(input_lines, "  "),
+            "  ",
+        )
+
+        self.assertEqual(standalone, input_lines)
+
+        self.assertEqual(
+            list(texformatter.indent_lines(input_lines, "  ")),
+            ["\\section{A}", "  \\begin{verbatim}", " x", "  \\end{verbatim}"],
+        )
+
+    def test_max_env_depth(self) -> None:
+        """Test that max_env_depth follows begin, end and verbatim rules."""
+        input_lines = [
+            "\\begin{document}",
+            "  \\begin{itemize}",
+            "  \\end{itemize}",
+            "\\begin{verbatim}",
+            "\\end{a}",
+            "\\begin{a}",
+            "\\begin{b}",
+            "\\end{verbatim}",
+            "\\begin{}",
+            "\\end{document}",
+        ]
+
+        self.assertEqual(texformatter.max_env_depth(input_lines), 2)
+        self.assertEqual(texformatter.max_env_depth(input_lines[:1]), 1)
+
+    def test_final_cleanup_matches_focused_helpers(self) -> None:
+        """Test that final_cleanup equals collapsing then edge trimming."""
+        input_lines = ["", "  ", "a  ", "", "", "b", "\t", ""]
+        collapsed = texformatter.collapse_and_trim_lines(input_lines)
+
+        self.assertEqual(
+            texformatter.final_cleanup(input_lines),
+            texformatter.trim_edge_blank_lines(collapsed),
+        )
+
+        self.assertEqual(
+            texformatter.final_cleanup(input_lines), ["a", "", "b"]
+        )
+
+    def test_indent_latex_deep_nesting(self) -> None:
+        """Test indentation of environments nested more than 64 deep."""
+        depth = 100
+        input_code = "\\begin{a}\n" * depth + "x\n" + "\\end{a}\n" * depth
+        lines = texformatter.indent_latex(input_code, " ").split("\n")
+
+        self.assertEqual(len(lines), 2 * depth + 1)
+        self.assertEqual(lines[70], " " * 70 + "\\begin{a}")
+        self.assertEqual(lines[depth], " " * depth + "x")
+        self.assertEqual(lines[-1], "\\end{a}")
+
+    def test_indent_prefix_caches_only_short_prefixes(self) -> None:
+        """Test that long indent prefixes are not kept in the cache."""
+        texformatter.cached_indent_prefix.cache_clear()
+
+        self.assertEqual(texformatter.indent_prefix("  ", 3), "      ")
+        self.assertEqual(texformatter.indent_prefix(" " * 1000, 2), " " * 2000)
+
+        self.assertEqual(
+            texformatter.cached_indent_prefix.cache_info().currsize, 1
+        )
+
+    def test_indent_lines_shares_cached_prefixes(self) -> None:
+        """Test that indent_lines takes its prefixes from indent_prefix."""
+        texformatter.cached_indent_prefix.cache_clear()
+        input_lines = ["\\begin{a}", "\\begin{b}", "x"]
+
+        first = list(texformatter.indent_lines(input_lines, "  "))
+        second = list(texformatter.indent_lines(input_lines, "  "))
+
+        self.assertEqual(first, ["\\begin{a}", "  \\begin{b}", "    x"])
+        self.assertEqual(first, second)
+        self.assertEqual(
+            texformatter.cached_indent_prefix.cache_info().hits, 2
+        )
+
     def test_verbatim_environment_preserves_content(self) -> None:
         """Test that content inside verbatim environments is preserved exactly."""
         input_lines = [
@@ -344,6 +523,158 @@ class TestMainFunction(TestCase):
         backup_file = self.test_file + ".bak"
         self.assertTrue(path.exists(str(backup_file)))
 
+    def test_in_place_keeps_mode_and_cleans_up(self) -> None:
+        """Test that in-place edits keep the file mode and leave no
+        temporary file behind."""
+        chmod(self.test_file, 0o640)
+        argv_args = ["texformatter.py", self.test_file, "--in-place"]
+
+        with mock.patch.object(sys, "argv", argv_args):
+            texformatter.main()
+
+        self.assertEqual(stat(self.test_file).st_mode & 0o777, 0o640)
+        self.assertEqual(listdir(self.temp_dir), ["test.tex"])
+
+        with open(self.test_file) as f:
+            self.assertEqual(
+                f.read(), "\\begin{document}\n    Hello\n\\end{document}"
+            )
+
+    def test_in_place_keeps_existing_tmp_file(self) -> None:
+        """Test that a file named like the old fixed temporary name is
+        left untouched."""
+        tmp_file = self.test_file + ".tmp"
+
+        with open(tmp_file, "w") as f:
+            f.write("keep me")
+
+        try:
+            texformatter.main([self.test_file, "--in-place"])
+
+            with open(tmp_file) as f:
+                self.assertEqual(f.read(), "keep me")
+
+        finally:
+            remove(tmp_file)
+
+    def test_in_place_failed_replace_cleans_up(self) -> None:
+        """Test that the temporary file is removed when the rename fails."""
+        with mock.patch.object(texformatter, "replace", side_effect=OSError):
+            with self.assertRaises(OSError):
+                texformatter.format_in_place(self.test_file, "    ", False)
+
+        self.assertEqual(listdir(self.temp_dir), ["test.tex"])
+
+    def test_in_place_skips_formatted_file(self) -> None:
+        """Test that an already formatted file is neither rewritten nor
+        backed up."""
+        formatted = "\\begin{document}\n    Hello\n\\end{document}"
+
+        with open(self.test_file, "w") as f:
+            f.write(formatted)
+
+        argv_args = [
+            "texformatter.py",
+            self.test_file,
+            "--in-place",
+            "--backup",
+        ]
+
+        with mock.patch.object(texformatter, "replace") as replace_mock:
+            with mock.patch.object(sys, "argv", argv_args):
+                texformatter.main()
+
+        replace_mock.assert_not_called()
+        self.assertFalse(path.exists(self.test_file + ".bak"))
+
+    def test_main_tabs_and_spaces_exclusive(self) -> None:
+        """Test that --tabs and --spaces cannot be combined."""
+        with mock.patch.object(sys, "stderr"):
+            with self.assertRaises(SystemExit):
+                texformatter.main([self.test_file, "--tabs", "--spaces", "2"])
+
+    def test_main_with_argv(self) -> None:
+        """Test main() with an explicit argument list."""
+        texformatter.main([self.test_file, "--in-place", "--tabs"])
+
+        with open(self.test_file) as f:
+            self.assertEqual(
+                f.read(), "\\begin{document}\n\tHello\n\\end{document}"
+            )
+
+    def test_main_multiple_files_in_place(self) -> None:
+        """Test formatting several files in place in one invocation."""
+        other_file = path.join(self.temp_dir, "other.tex")
+
+        with open(other_file, "w") as f:
+            f.write("\\begin{itemize}\n\\item One\n\\end{itemize}\n")
+
+        try:
+            texformatter.main([self.test_file, other_file, "--in-place"])
+
+            with open(other_file) as f:
+                self.assertEqual(
+                    f.read(),
+                    "\\begin{itemize}\n    \\item One\n\\end{itemize}",
+                )
+
+        finally:
+            remove(other_file)
+
+        with open(self.test_file) as f:
+            self.assertEqual(
+                f.read(), "\\begin{document}\n    Hello\n\\end{document}"
+            )
+
+    def test_stdout_matches_in_place_line_splitting(self) -> None:
+        """Test that stdout and in-place output split lines the same way."""
+        with open(self.test_file, "w") as f:
+            f.write("\\begin{document}\fHello\u2028World\n\\end{document}\n")
+
+        with mock.patch.object(sys, "stdout", new_callable=StringIO) as out:
+            texformatter.main([self.test_file])
+
+        texformatter.main([self.test_file, "--in-place"])
+
+        with open(self.test_file) as f:
+            self.assertEqual(out.getvalue(), "\n\n" + f.read() + "\n\n\n")
+
+    def test_main_in_place_duplicate_paths(self) -> None:
+        """Test that a file named twice is formatted and reported once."""
+        same_file = path.join(self.temp_dir, ".", "test.tex")
+
+        with mock.patch.object(sys, "stdout", new_callable=StringIO) as out:
+            texformatter.main([self.test_file, same_file, "--in-place"])
+
+        self.assertEqual(
+            out.getvalue(), f"File formatted in place: {self.test_file}\n"
+        )
+
+    def test_main_in_place_reports_every_failure(self) -> None:
+        """Test that one failing file does not hide the others' results."""
+        missing_file = path.join(self.temp_dir, "missing.tex")
+
+        with mock.patch.object(sys, "stdout", new_callable=StringIO) as out:
+            with mock.patch.object(
+                sys, "stderr", new_callable=StringIO
+            ) as err:
+                with self.assertRaises(SystemExit) as cm:
+                    texformatter.main(
+                        [missing_file, self.test_file, "--in-place"]
+                    )
+
+        self.assertEqual(cm.exception.code, 1)
+        self.assertIn(f"Error formatting {missing_file}", err.getvalue())
+
+        self.assertEqual(
+            out.getvalue(), f"File formatted in place: {self.test_file}\n"
+        )
+
+        with open(self.test_file) as f:
+            self.assertEqual(
+                f.read(), "\\begin{document}\n    Hello\n\\end{document}"
+            )
+
     def test_cli_entry_point(self) -> None:
         """Test running texformatter.py as a script."""
         result = run(
@@ -359,8 +690,36 @@ class TestMainFunction(TestCase):
         argv_args = ["texformatter.py", "nonexistent.tex"]
 
         with mock.patch.object(sys, "argv", argv_args):
-            with self.assertRaises(FileNotFoundError):
-                texformatter.main()
+            with mock.patch.object(
+                sys, "stderr", new_callable=StringIO
+            ) as err:
+                with self.assertRaises(SystemExit) as cm:
+                    texformatter.main()
+
+        self.assertEqual(cm.exception.code, 1)
+        self.assertIn("Error formatting nonexistent.tex", err.getvalue())
+
+    def test_main_stdout_reports_every_failure(self) -> None:
+        """Test that printing several files labels each one and carries
+        on past a file that cannot be read."""
+        missing_file = path.join(self.temp_dir, "missing.tex")
+
+        with mock.patch.object(sys, "stdout", new_callable=StringIO) as out:
+            with mock.patch.object(
+                sys, "stderr", new_callable=StringIO
+            ) as err:
+                with self.assertRaises(SystemExit) as cm:
+                    texformatter.main([missing_file, self.test_file])
+
+        self.assertEqual(cm.exception.code, 1)
+        self.assertIn(f"Error formatting {missing_file}", err.getvalue())
+
+        self.assertEqual(
+            out.getvalue(),
+            f"==> {missing_file} <==\n"
+            f"==> {self.test_file} <==\n"
+            "\n\n\\begin{document}\n    Hello\n\\end{document}\n\n\n",
+        )
 
 
 if __name__ == "__main__":